@@ -1,13 +1,23 @@
 # Importa bibliotecas necessárias
 import asyncio
+import importlib.util
+import itertools
+import hashlib
+import json
 import os
 import sys
+import tempfile
+import threading
+import time
 
 # Importa componentes do cliente MCP
 from typing import Optional  # Para dicas de tipo de valores opcionais
+from collections import OrderedDict  # Para o cache LRU de consultas
 from contextlib import AsyncExitStack  # Para gerenciar múltiplas tarefas assíncronas
 from mcp import ClientSession, StdioServerParameters  # Gerenciamento de sessão MCP
 from mcp.client.stdio import stdio_client  # Cliente MCP para comunicação de E/S padrão
+from mcp.types import CallToolResult  # Resultado de uma chamada de ferramenta MCP
+import httpx  # Transporte HTTP usado pelo SDK do Gemini
 
 # Importa o SDK de IA Generativa do Google
 from google import genai
@@ -18,25 +28,104 @@ from google.genai.types import GenerateContentConfig
 from dotenv import load_dotenv  # Para carregar chaves de API do arquivo .env
 load_dotenv()
 
+# Tempo de vida (em segundos) do cache de contexto com as declarações das ferramentas
+TOOLS_CACHE_TTL = 3600
+
+# Mínimo de tokens exigido pelo cache de contexto explícito do gemini-1.5-flash. Esquemas menores
+# (estimados em ~4 caracteres por token) são enviados em cada requisição, sem tentar criar o cache.
+TOOLS_CACHE_MIN_TOKENS = 32768
+
+# Camada de serviço da chamada que sucede a execução das ferramentas. A camada 'flex' (mais barata,
+# menos urgente) só é usada se o SDK instalado suportar o campo; caso contrário, usa a camada padrão.
+FOLLOW_UP_SERVICE_TIER = 'flex' if 'service_tier' in GenerateContentConfig.model_fields else None
+
+# A Batch API do Gemini com arquivos JSONL exige uma versão do SDK em que o destino do job
+# em lote tenha o campo 'file_name' (em versões antigas, 'batches' aceita apenas gs:// e bq://)
+BATCH_FILES_SUPPORTED = 'file_name' in types.BatchJobDestination.model_fields
+
+# Cache das ferramentas já convertidas para o formato Gemini, indexado pelo hash das definições MCP
+_TOOL_CONVERT_CACHE: dict[str, list[Tool]] = {}
+
+# Pool de conexões HTTP persistentes para a API Gemini. HTTP/2 (multiplexação de requisições
+# simultâneas em uma conexão) é usado apenas se o pacote opcional 'h2' estiver instalado.
+GEMINI_HTTP_ARGS = {
+    "http2": importlib.util.find_spec("h2") is not None,
+    "limits": httpx.Limits(max_connections=32, max_keepalive_connections=16),
+}
+
+# Comando usado para iniciar o servidor MCP, de acordo com a extensão do script.
+# Scripts Python usam o mesmo interpretador do cliente (sys.executable), não o "python" do PATH.
+_COMMAND_BY_EXT = {'.py': sys.executable, '.js': 'node', '.mjs': 'node', '.ts': 'tsx'}
+
+# Papéis das mensagens enviadas ao Gemini
+_USER_ROLE = 'user'
+_MODEL_ROLE = 'model'
+_TOOL_ROLE = 'tool'
+
 class MCPClient:
-    def __init__(self):
-        """Inicializa o cliente MCP e configura a API Gemini."""
+    def __init__(self, memoize_queries: bool = False, memo_maxsize: int = 128,
+                 memoizable_tools: Optional[set[str]] = None, passthrough_tools: Optional[set[str]] = None,
+                 cache_tools: bool = False):
+        """
+        Inicializa o cliente MCP e configura a API Gemini.
+
+        Args:
+            memoize_queries (bool): Se True, reutiliza a resposta de consultas idênticas já processadas.
+            memo_maxsize (int): Número máximo de respostas mantidas no cache (política LRU).
+            memoizable_tools (set[str], opcional): Ferramentas idempotentes cujos resultados podem ser
+                reutilizados. Se omitido, é lido de MCP_MEMOIZABLE_TOOLS (nomes separados por vírgula).
+            passthrough_tools (set[str], opcional): Ferramentas cuja saída é devolvida ao usuário sem passar
+                novamente pelo Gemini. Se omitido, é lido de MCP_PASSTHROUGH_TOOLS (nomes separados por vírgula).
+            cache_tools (bool): Se True, envia o esquema das ferramentas como cache de contexto do Gemini
+                (apenas quando ele atinge o mínimo de tokens exigido pela API).
+        """
         self.session: Optional[ClientSession] = None  # Sessão MCP para comunicação
         self.exit_stack = AsyncExitStack()  # Gerencia a limpeza de recursos assíncronos
 
+        # Cache LRU opcional das respostas finais, indexado pelo hash da consulta
+        self.memoize_queries = memoize_queries
+        self.memo_maxsize = memo_maxsize
+        self._query_cache: OrderedDict[str, str] = OrderedDict()
+
+        # Cache de resultados de ferramentas, ativado apenas para as ferramentas listadas
+        if memoizable_tools is None:
+            memoizable_tools = tool_names_from_env("MCP_MEMOIZABLE_TOOLS")
+        self._memoizable_tools: set[str] = set(memoizable_tools)
+        self._tool_cache: dict[str, CallToolResult] = {}
+        self._tool_inflight: dict[str, asyncio.Task] = {}  # Chamadas memoizáveis ainda em execução
+
+        # Ferramentas cuja saída bruta já é a resposta final (dispensa a segunda chamada ao Gemini)
+        if passthrough_tools is None:
+            passthrough_tools = tool_names_from_env("MCP_PASSTHROUGH_TOOLS")
+        self._passthrough_tools: set[str] = set(passthrough_tools)
+
+        # Cache de contexto do Gemini com o esquema das ferramentas (criado em connect_to_server)
+        self.cache_tools = cache_tools
+        self._cached_content = None
+        self._cached_content_expires_at = 0.0
+
+        # Configurações de geração já montadas, por camada de serviço (recriadas quando o cache muda)
+        self._gen_configs: dict[Optional[str], GenerateContentConfig] = {}
+
         gemini_api_key = os.getenv("GEMINI_API_KEY")
         if not gemini_api_key:
             raise ValueError("GEMINI_API_KEY não encontrada. Adicione-a ao seu arquivo .env.")
 
-        # Configura o cliente de IA Gemini
-        self.genai_client = genai.Client(api_key=gemini_api_key)
+        # Configura o cliente de IA Gemini, reutilizando conexões entre as chamadas
+        self.genai_client = genai.Client(
+            api_key=gemini_api_key,
+            http_options=types.HttpOptions(
+                client_args=GEMINI_HTTP_ARGS,
+                async_client_args=GEMINI_HTTP_ARGS,
+            ),
+        )
 
     async def connect_to_server(self, server_script_path: str):
         """Conecta ao servidor MCP e lista as ferramentas disponíveis."""
 
-        # Determina se o script do servidor está escrito em Python ou JavaScript
+        # Determina a linguagem do script do servidor pela extensão (Node.js por padrão)
         # Isso nos permite executar o comando correto para iniciar o servidor MCP
-        command = "python" if server_script_path.endswith('.py') else "node"
+        command = _COMMAND_BY_EXT.get(os.path.splitext(server_script_path)[1], 'node')
 
         # Define os parâmetros para conexão ao servidor MCP
         server_params = StdioServerParameters(command=command, args=[server_script_path])
@@ -63,6 +152,74 @@ class MCPClient:
         # Converte as ferramentas MCP para o formato Gemini
         self.function_declarations = convert_mcp_tools_to_gemini(tools)
 
+        # Envia o esquema das ferramentas uma única vez como cache de contexto, se habilitado
+        self._refresh_tools_cache()
+
+        # Monta antecipadamente as configurações usadas em cada consulta. Assim, uma configuração
+        # inválida falha aqui, e não depois que uma ferramenta já foi executada.
+        self._generation_config()
+        self._generation_config(service_tier=FOLLOW_UP_SERVICE_TIER)
+
+    def _refresh_tools_cache(self):
+        """
+        Cria (ou recria) o cache de contexto do Gemini contendo as declarações das ferramentas.
+
+        O cache anterior é apagado antes. Se o cache estiver desabilitado, o esquema for pequeno demais
+        ou a criação falhar, as ferramentas continuam sendo enviadas em cada requisição.
+        """
+        self._gen_configs.clear()  # As configurações anteriores referenciam o cache antigo
+        self._delete_tools_cache()
+
+        if not self.cache_tools:
+            return
+        schema_chars = sum(len(tool.model_dump_json(exclude_none=True)) for tool in self.function_declarations)
+        if schema_chars // 4 < TOOLS_CACHE_MIN_TOKENS:
+            return
+
+        try:
+            self._cached_content = self.genai_client.caches.create(
+                model='gemini-1.5-flash',
+                config=types.CreateCachedContentConfig(
+                    tools=self.function_declarations,
+                    ttl=f"{TOOLS_CACHE_TTL}s",
+                ),
+            )
+            # Renova um pouco antes da expiração real para evitar referenciar um cache expirado
+            self._cached_content_expires_at = time.monotonic() + TOOLS_CACHE_TTL - 60
+        except Exception as e:
+            print(f"\n[Cache de contexto indisponível, enviando ferramentas em cada requisição: {e}]")
+            self._cached_content = None
+
+    def _delete_tools_cache(self):
+        """Apaga o cache de contexto das ferramentas, se existir, para que ele deixe de ser cobrado."""
+        if self._cached_content is not None:
+            try:
+                self.genai_client.caches.delete(name=self._cached_content.name)
+            except Exception:
+                pass  # O cache expira sozinho após o TTL
+            self._cached_content = None
+
+    def _generation_config(self, service_tier: Optional[str] = None, refresh: bool = True) -> GenerateContentConfig:
+        """
+        Retorna a configuração de geração, referenciando o cache de ferramentas quando disponível.
+
+        Args:
+            service_tier (str, opcional): Camada de serviço do Gemini (ex: 'flex' para chamadas não urgentes).
+            refresh (bool): Se True, renova o cache de contexto das ferramentas quando ele estiver para expirar.
+        """
+        if refresh and self._cached_content is not None and time.monotonic() >= self._cached_content_expires_at:
+            self._refresh_tools_cache()
+
+        # Reutiliza a configuração já montada em vez de alocar uma nova a cada chamada
+        config = self._gen_configs.get(service_tier)
+        if config is None:
+            kwargs = {"service_tier": service_tier} if service_tier else {}
+            if self._cached_content is not None:
+                config = GenerateContentConfig(cached_content=self._cached_content.name, **kwargs)
+            else:
+                config = GenerateContentConfig(tools=self.function_declarations, **kwargs)
+            self._gen_configs[service_tier] = config
+        return config
 
     async def process_query(self, query: str) -> str:
         """
@@ -75,9 +232,15 @@ class MCPClient:
             str: A resposta gerada pelo modelo Gemini.
         """
 
+        # Se a memoização estiver ativa, devolve a resposta já calculada sem chamar o Gemini
+        cache_key = hashlib.sha256(query.encode()).hexdigest()
+        if self.memoize_queries and cache_key in self._query_cache:
+            self._query_cache.move_to_end(cache_key)  # Marca como usada recentemente
+            return self._query_cache[cache_key]
+
         # Formata a entrada do usuário como um objeto Content estruturado para Gemini
         user_prompt_content = types.Content(
-            role='user',  
+            role=_USER_ROLE,  
             parts=[types.Part.from_text(text=query)]  # Converte a consulta de texto em um formato compatível com Gemini
         )
 
@@ -85,69 +248,260 @@ class MCPClient:
         response = self.genai_client.models.generate_content(
             model='gemini-1.5-flash',  
             contents=[user_prompt_content],  # Envia a entrada do usuário para Gemini
-            config=types.GenerateContentConfig(
-                tools=self.function_declarations,  # Passa a lista de ferramentas MCP disponíveis para o Gemini usar
-            ),
+            config=self._generation_config(),  # Referencia as ferramentas MCP disponíveis (via cache de contexto, se houver)
         )
 
         # Inicializa variáveis para armazenar o texto da resposta final e as mensagens do assistente
         final_text = [] 
         assistant_message_content = []  # Armazena as respostas do assistente
+        can_memoize = True  # Falhas de ferramenta não são memoizadas para que sejam reexecutadas
+
+        # Achata as partes de todos os candidatos que têm conteúdo em uma única lista
+        parts = list(itertools.chain.from_iterable(
+            candidate.content.parts for candidate in response.candidates
+            if candidate.content and candidate.content.parts
+        ))
+
+        # Processa a resposta recebida do Gemini, separando textos de chamadas de função
+        Part = types.Part  # Referência local evita a busca do atributo a cada iteração
+        function_call_parts = []
+        for part in parts:
+            if isinstance(part, Part):  # Verifica se a parte é uma unidade de resposta Gemini válida
+                if part.function_call:  # Se o Gemini sugerir uma chamada de função, processe-a depois
+                    function_call_parts.append(part)
+                else:
+                    # Se nenhuma chamada de função foi solicitada, simplesmente adicione a resposta de texto do Gemini
+                    final_text.append(part.text)
+
+        if function_call_parts:
+            # Imprime informações de depuração: Quais ferramentas estão sendo chamadas e com quais argumentos
+            for part in function_call_parts:
+                print(f"\n[Gemini solicitou chamada de ferramenta: {part.function_call.name} com args {part.function_call.args}]")
+
+            # Se todas as ferramentas forem de passagem direta, a saída delas é a própria resposta
+            passthrough = all(part.function_call.name in self._passthrough_tools for part in function_call_parts)
+
+            # Executa todas as ferramentas simultaneamente no servidor MCP
+            results = await asyncio.gather(
+                *[self.call_tool_cached(part.function_call.name, part.function_call.args) for part in function_call_parts],
+                return_exceptions=True,
+            )
+
+            # Devolve a saída bruta das ferramentas de passagem direta, sem uma nova chamada ao Gemini
+            if passthrough:
+                for part, result in zip(function_call_parts, results):
+                    if isinstance(result, BaseException):
+                        final_text.append(f"[Erro ao executar {part.function_call.name}: {result}]")
+                        can_memoize = False
+                    elif result.isError:
+                        final_text.append(f"[Erro ao executar {part.function_call.name}: {tool_result_to_text(result.content)}]")
+                        can_memoize = False
+                    else:
+                        final_text.append(tool_result_to_text(result.content))
+                return self._memoize_answer(cache_key, final_text, can_memoize)
+
+            # Monta o conteúdo e a configuração da chamada de acompanhamento
+            contents, config = self._prepare_follow_up(user_prompt_content, function_call_parts)
+
+            # Formata cada resposta de ferramenta para o Gemini de uma forma que ele entenda
+            function_response_parts = []
+            for part, result in zip(function_call_parts, results):
+                if isinstance(result, BaseException):
+                    function_response = {"error": str(result)}
+                    can_memoize = False
+                elif result.isError:
+                    # O servidor MCP reporta falhas da ferramenta no próprio resultado, sem lançar exceção
+                    function_response = {"error": tool_result_to_text(result.content)}
+                    can_memoize = False
+                else:
+                    function_response = {"result": result.content}  # Armazena a saída da ferramenta
+                function_response_parts.append(types.Part.from_function_response(
+                    name=part.function_call.name,  # Nome da função/ferramenta executada
+                    response=function_response  # O resultado da execução da função
+                ))
+
+            # Estrutura as respostas das ferramentas como um único objeto Content para Gemini
+            function_response_content = types.Content(
+                role=_TOOL_ROLE,  # Especifica que esta resposta vem de uma ferramenta
+                parts=function_response_parts  # Anexa as partes das respostas formatadas
+            )
+
+            # Envia os resultados das ferramentas de volta para o Gemini em uma única chamada
+            response = self.genai_client.models.generate_content(
+                model='gemini-1.5-flash',  # Usa o mesmo modelo
+                contents=contents + [function_response_content],  # Inclui os resultados da execução das ferramentas
+                config=config,
+            )
+
+            # Extrai o texto da resposta final do Gemini após processar as chamadas das ferramentas
+            final_text.append(response.candidates[0].content.parts[0].text)
+
+        return self._memoize_answer(cache_key, final_text, can_memoize)
+
+    def _memoize_answer(self, cache_key: str, final_text: list[str], can_memoize: bool) -> str:
+        """Combina as partes da resposta e a armazena no cache de consultas, se permitido."""
+        # Combina a resposta como uma única string formatada
+        answer = "\n".join(final_text)
+
+        # Armazena a resposta no cache, descartando a entrada menos usada se necessário
+        if self.memoize_queries and can_memoize:
+            self._query_cache[cache_key] = answer
+            if len(self._query_cache) > self.memo_maxsize:
+                self._query_cache.popitem(last=False)
+
+        return answer
+
+    def _prepare_follow_up(self, user_prompt_content: types.Content,
+                           function_call_parts: list[types.Part]) -> tuple[list[types.Content], GenerateContentConfig]:
+        """
+        Monta o início do conteúdo e a configuração da chamada que sucede a execução das ferramentas.
+
+        É apenas uma organização do código, sem ganho de latência. Não renova o cache de contexto das
+        ferramentas (isso já acontece, se necessário, na primeira chamada da consulta), então não faz
+        nenhuma chamada de rede.
+
+        Returns:
+            tuple: A lista de conteúdos (consulta + chamadas de função) e a configuração de geração.
+        """
+        contents = [
+            user_prompt_content,  # Inclui a consulta original do usuário
+            types.Content(role=_MODEL_ROLE, parts=function_call_parts),  # Inclui as solicitações de chamada de função do Gemini
+        ]
+        # Fornece as ferramentas disponíveis para uso contínuo. Esta chamada já sucede uma
+        # execução de ferramenta, então usa a camada 'flex' quando o SDK a suporta.
+        return contents, self._generation_config(service_tier=FOLLOW_UP_SERVICE_TIER, refresh=False)
+
+    async def process_queries_batch(self, queries: list[str], poll_interval: float = 30.0) -> list[str]:
+        """
+        Processa várias consultas de uma vez pela Batch API do Gemini (custo reduzido, sem interatividade).
 
-        # Processa a resposta recebida do Gemini
-        for candidate in response.candidates:
-            if candidate.content.parts:  # Garante que a resposta tenha conteúdo
-                for part in candidate.content.parts:
-                    if isinstance(part, types.Part):  # Verifica se a parte é uma unidade de resposta Gemini válida
-                        if part.function_call:  # Se o Gemini sugerir uma chamada de função, processe-a
-                            # Extrai os detalhes da chamada de função
-                            function_call_part = part  # Armazena a resposta da chamada de função
-                            tool_name = function_call_part.function_call.name  # Nome da ferramenta MCP que o Gemini quer chamar
-                            tool_args = function_call_part.function_call.args  # Argumentos necessários para a execução da ferramenta
-
-                            # Imprime informações de depuração: Qual ferramenta está sendo chamada e com quais argumentos
-                            print(f"\n[Gemini solicitou chamada de ferramenta: {tool_name} com args {tool_args}]")
-
-                            # Executa a ferramenta usando o servidor MCP
-                            try:
-                                result = await self.session.call_tool(tool_name, tool_args)  # Chama a ferramenta MCP com os argumentos
-                                function_response = {"result": result.content}  # Armazena a saída da ferramenta
-                            except Exception as e:
-                                function_response = {"error": str(e)}
-
-                            # Formata a resposta da ferramenta para o Gemini de uma forma que ele entenda
-                            function_response_part = types.Part.from_function_response(
-                                name=tool_name,  # Nome da função/ferramenta executada
-                                response=function_response  # O resultado da execução da função
-                            )
-
-                            # Estrutura a resposta da ferramenta como um objeto Content para Gemini
-                            function_response_content = types.Content(
-                                role='tool',  # Especifica que esta resposta vem de uma ferramenta
-                                parts=[function_response_part]  # Anexa a parte da resposta formatada
-                            )
-
-                            # Envia os resultados da execução da ferramenta de volta para o Gemini para processamento
-                            response = self.genai_client.models.generate_content(
-                                model='gemini-1.5-flash',  # Usa o mesmo modelo
-                                contents=[
-                                    user_prompt_content,  # Inclui a consulta original do usuário
-                                    function_call_part,  # Inclui a solicitação de chamada de função do Gemini
-                                    function_response_content,  # Inclui o resultado da execução da ferramenta
-                                ],
-                                config=types.GenerateContentConfig(
-                                    tools=self.function_declarations,  # Fornece as ferramentas disponíveis para uso contínuo
-                                ),
-                            )
-
-                            # Extrai o texto da resposta final do Gemini após processar a chamada da ferramenta
-                            final_text.append(response.candidates[0].content.parts[0].text)
-                        else:
-                            # Se nenhuma chamada de função foi solicitada, simplesmente adicione a resposta de texto do Gemini
-                            final_text.append(part.text)
-
-        # Retorna a resposta combinada como uma única string formatada
-        return "\n".join(final_text)
+        Como o processamento em lote não suporta múltiplos turnos, as ferramentas MCP não são executadas:
+        use este método apenas para consultas que não dependem de chamadas de função.
+
+        Args:
+            queries (list[str]): As consultas a serem processadas.
+            poll_interval (float): Intervalo, em segundos, entre verificações do estado do job.
+
+        Returns:
+            list[str]: As respostas, na mesma ordem das consultas (ou a mensagem de erro de cada requisição).
+
+        Raises:
+            RuntimeError: Se o SDK instalado não suportar jobs em lote a partir de arquivos na API Gemini.
+        """
+        # Falha antes de enviar qualquer arquivo se o SDK não suportar a Batch API com arquivos
+        if not BATCH_FILES_SUPPORTED:
+            raise RuntimeError(
+                "A versão instalada do google-genai não suporta jobs em lote com arquivos na API Gemini. "
+                "Atualize o pacote google-genai para usar process_queries_batch."
+            )
+
+        # Monta o arquivo JSONL com uma requisição por linha, identificada por uma chave única
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+            for i, query in enumerate(queries):
+                line = {"key": f"req_{i}", "request": {"contents": [{"parts": [{"text": query}]}]}}
+                f.write(json.dumps(line) + "\n")
+            path = f.name
+
+        # As chamadas HTTP do SDK são síncronas, então rodam em uma thread para não bloquear o loop de eventos
+        try:
+            # Envia o arquivo de requisições
+            uploaded = await asyncio.to_thread(
+                self.genai_client.files.upload, file=path, config={"mime_type": "jsonl"}
+            )
+        finally:
+            os.remove(path)
+
+        try:
+            # Cria o job em lote
+            batch_job = await asyncio.to_thread(
+                self.genai_client.batches.create,
+                model='gemini-1.5-flash',
+                src=uploaded.name,
+                config={'display_name': 'mcp_batch'},
+            )
+
+            # Aguarda a conclusão do job sem bloquear o loop de eventos
+            done_states = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
+            while batch_job.state.name not in done_states:
+                await asyncio.sleep(poll_interval)
+                batch_job = await asyncio.to_thread(self.genai_client.batches.get, name=batch_job.name)
+
+            if batch_job.state.name != 'JOB_STATE_SUCCEEDED':
+                raise RuntimeError(f"Job em lote terminou com estado {batch_job.state.name}: {batch_job.error}")
+
+            # Baixa os resultados
+            content = await asyncio.to_thread(self.genai_client.files.download, file=batch_job.dest.file_name)
+        finally:
+            # Remove o arquivo de requisições da Files API, mesmo se o job falhar
+            try:
+                await asyncio.to_thread(self.genai_client.files.delete, name=uploaded.name)
+            except Exception:
+                pass  # Arquivos enviados expiram sozinhos após algum tempo
+
+        # Reordena os resultados pela chave de cada requisição
+        answers = [""] * len(queries)
+        for line in content.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            index = int(item["key"].removeprefix("req_"))
+            if "response" in item:
+                parts = item["response"]["candidates"][0]["content"]["parts"]
+                answers[index] = "".join(part.get("text", "") for part in parts)
+            else:
+                answers[index] = str(item.get("error"))
+
+        return answers
+
+    async def call_tool_cached(self, tool_name: str, tool_args: dict) -> CallToolResult:
+        """
+        Chama uma ferramenta MCP, reutilizando o resultado anterior se a ferramenta for memoizável.
+
+        Args:
+            tool_name (str): Nome da ferramenta MCP.
+            tool_args (dict): Argumentos da chamada.
+
+        Returns:
+            CallToolResult: O resultado da ferramenta (com isError=True se ela falhou).
+        """
+        if tool_name not in self._memoizable_tools:
+            return await self.session.call_tool(tool_name, tool_args)
+
+        key = hashlib.sha256(
+            json.dumps({"n": tool_name, "a": tool_args}, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        if key in self._tool_cache:
+            return self._tool_cache[key]
+
+        # Chamadas idênticas simultâneas (ex: na mesma resposta do Gemini) compartilham a mesma execução
+        task = self._tool_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self.session.call_tool(tool_name, tool_args))
+            self._tool_inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_tool_call(key, done))
+
+        # shield impede que o cancelamento de um chamador cancele a execução compartilhada
+        return await asyncio.shield(task)
+
+    def _finish_tool_call(self, key: str, task: asyncio.Task):
+        """Remove a chamada da lista em execução e grava o resultado no cache se ela teve sucesso."""
+        self._tool_inflight.pop(key, None)
+
+        # Falhas (exceções ou resultados marcados com isError) não são gravadas no cache,
+        # para que a chamada seja reexecutada
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if not result.isError:
+            self._tool_cache[key] = result
+
+    def clear_tool_cache(self):
+        """Descarta os resultados de ferramentas memoizados (ex: após um comando com efeitos colaterais)."""
+        self._tool_cache.clear()
+
+    def clear_memo_cache(self):
+        """Descarta todas as respostas memoizadas (ex: ao iniciar uma nova sessão)."""
+        self._query_cache.clear()
 
 
     async def chat_loop(self):
@@ -155,7 +509,8 @@ class MCPClient:
         print("\nCliente MCP Iniciado! Digite 'quit' para sair.")
 
         while True:
-            query = input("\nConsulta: ").strip()
+            # Lê a entrada sem bloquear o loop de eventos enquanto o usuário digita
+            query = (await ainput("\nConsulta: ")).strip()
             if query.lower() == 'quit':
                 break
 
@@ -165,11 +520,74 @@ class MCPClient:
 
     async def cleanup(self):
         """Limpa os recursos antes de sair."""
+        self._delete_tools_cache()
+        self._gen_configs.clear()
         await self.exit_stack.aclose()
 
+async def ainput(prompt: str = "") -> str:
+    """
+    Lê uma linha da entrada padrão sem bloquear o loop de eventos.
+
+    A leitura roda em uma thread daemon, e não no executor padrão do asyncio: assim, um Ctrl+C
+    durante a espera encerra o programa sem aguardar o usuário pressionar Enter.
+
+    Args:
+        prompt (str): O texto exibido antes da leitura.
+
+    Returns:
+        str: A linha digitada pelo usuário.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(setter, value):
+        if not future.done():  # A espera pode ter sido cancelada enquanto o usuário digitava
+            setter(value)
+
+    def read():
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            callback = (deliver, future.set_exception, e)
+        else:
+            callback = (deliver, future.set_result, line)
+        try:
+            loop.call_soon_threadsafe(*callback)
+        except RuntimeError:
+            pass  # O loop de eventos já foi encerrado
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+def tool_names_from_env(var_name: str) -> set[str]:
+    """
+    Lê um conjunto de nomes de ferramentas de uma variável de ambiente.
+
+    Args:
+        var_name (str): Nome da variável, com os nomes das ferramentas separados por vírgula.
+
+    Returns:
+        set[str]: Os nomes das ferramentas (vazio se a variável não estiver definida).
+    """
+    return {name.strip() for name in os.getenv(var_name, "").split(",") if name.strip()}
+
+def tool_result_to_text(content) -> str:
+    """
+    Converte o conteúdo retornado por uma ferramenta MCP em texto para exibição direta.
+
+    Args:
+        content (list): Lista de blocos de conteúdo MCP (ex: TextContent).
+
+    Returns:
+        str: O texto dos blocos, um por linha.
+    """
+    return "\n".join(getattr(block, "text", None) or str(block) for block in content)
+
 def clean_schema(schema):
     """
-    Remove recursivamente os campos 'title' do esquema JSON.
+    Remove os campos 'title' do esquema JSON, inclusive das propriedades aninhadas.
+
+    O esquema original não é modificado: cada dicionário visitado é copiado (cópia rasa) antes da limpeza.
 
     Args:
         schema (dict): O dicionário do esquema.
@@ -177,13 +595,22 @@ def clean_schema(schema):
     Returns:
         dict: Esquema limpo sem os campos 'title'.
     """
-    if isinstance(schema, dict):
-        schema.pop("title", None)  # Remove o título se presente
-
-        # Limpa recursivamente as propriedades aninhadas
-        if "properties" in schema and isinstance(schema["properties"], dict):
-            for key in schema["properties"]:
-                schema["properties"][key] = clean_schema(schema["properties"][key])
+    if not isinstance(schema, dict):
+        return schema
+    schema = dict(schema)
+
+    # Percorre o esquema com uma pilha explícita em vez de recursão; a pilha contém apenas cópias
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        node.pop("title", None)  # Remove o título se presente
+
+        # Substitui as propriedades aninhadas por cópias e agenda a limpeza delas
+        properties = node.get("properties")
+        if isinstance(properties, dict):
+            properties = {key: dict(value) if isinstance(value, dict) else value for key, value in properties.items()}
+            node["properties"] = properties
+            stack.extend(value for value in properties.values() if isinstance(value, dict))
 
     return schema
 
@@ -197,6 +624,14 @@ def convert_mcp_tools_to_gemini(mcp_tools):
     Returns:
         list: Lista de objetos Gemini Tool com declarações de função formatadas corretamente.
     """
+    # Reconexões ao mesmo servidor reutilizam a conversão já feita
+    key = hashlib.sha256(json.dumps(
+        [(tool.name, tool.description, tool.inputSchema) for tool in mcp_tools],
+        sort_keys=True, default=str,
+    ).encode()).hexdigest()
+    if key in _TOOL_CONVERT_CACHE:
+        return _TOOL_CONVERT_CACHE[key]
+
     gemini_tools = []
 
     for tool in mcp_tools:
@@ -214,6 +649,7 @@ def convert_mcp_tools_to_gemini(mcp_tools):
         gemini_tool = Tool(function_declarations=[function_declaration])
         gemini_tools.append(gemini_tool)
 
+    _TOOL_CONVERT_CACHE[key] = gemini_tools
     return gemini_tools
 
 
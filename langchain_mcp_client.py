@@ -16,13 +16,14 @@ Explicações detalhadas:
     Valores mais altos (ex: 0.7) produzem respostas mais criativas e variadas.
   - GOOGLE_API_KEY: Necessária para autenticação com o serviço de IA generativa do Google.
   
-As respostas são impressas como JSON usando um codificador personalizado para lidar com objetos não serializáveis.
+As respostas são impressas como JSON (via orjson) usando uma função padrão para lidar com objetos não serializáveis.
 """
 
 import asyncio                      # Para operações assíncronas
 import os                           # Para acessar variáveis de ambiente
 import sys                          # Para processamento de argumentos de linha de comando
-import json                         # Para impressão formatada de saída JSON
+import threading                    # Para ler a entrada do usuário sem bloquear o loop de eventos
+import orjson                       # Para impressão formatada de saída JSON (mais rápido que o json padrão)
 from contextlib import AsyncExitStack # Garante que todos os recursos assíncronos sejam fechados corretamente
 from typing import Optional, List   # Para dicas de tipo
 
@@ -46,19 +47,56 @@ from dotenv import load_dotenv
 load_dotenv()  # Carrega variáveis de ambiente de um arquivo .env (ex: GOOGLE_API_KEY)
 
 # ---------------------------
-# Codificador JSON Personalizado
+# Serialização JSON Personalizada
 # ---------------------------
-class CustomEncoder(json.JSONEncoder):
+def _default(o):
     """
-    Codificador JSON personalizado que lida com objetos com um atributo 'content'.
+    Função padrão do orjson para objetos que ele não sabe serializar.
     
-    Se um objeto tiver um atributo 'content', ele retorna um dicionário com o tipo do objeto e seu conteúdo.
-    Caso contrário, ele retorna ao codificador padrão.
+    Se um objeto tiver um atributo 'content', ela retorna um dicionário com o tipo do objeto e seu conteúdo.
+    Caso contrário, ela retorna a representação do objeto.
     """
-    def default(self, o):
-        if hasattr(o, "content"):
-            return {"type": o.__class__.__name__, "content": o.content}
-        return super().default(o)
+    if hasattr(o, "content"):
+        return {"type": type(o).__name__, "content": o.content}
+    return repr(o)
+
+# ---------------------------
+# Leitura Assíncrona da Entrada
+# ---------------------------
+async def ainput(prompt: str = "") -> str:
+    """
+    Lê uma linha da entrada padrão sem bloquear o loop de eventos.
+
+    A leitura roda em uma thread daemon, e não no executor padrão do asyncio: assim, um Ctrl+C
+    durante a espera encerra o programa sem aguardar o usuário pressionar Enter.
+
+    Args:
+        prompt (str): O texto exibido antes da leitura.
+
+    Returns:
+        str: A linha digitada pelo usuário.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(setter, value):
+        if not future.done():  # A espera pode ter sido cancelada enquanto o usuário digitava
+            setter(value)
+
+    def read():
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            callback = (deliver, future.set_exception, e)
+        else:
+            callback = (deliver, future.set_result, line)
+        try:
+            loop.call_soon_threadsafe(*callback)
+        except RuntimeError:
+            pass  # O loop de eventos já foi encerrado
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
 
 # ---------------------------
 # Instanciação do LLM
@@ -82,15 +120,61 @@ server_script = sys.argv[1]
 # ---------------------------
 # Parâmetros do Servidor MCP
 # ---------------------------
+# Comando usado para iniciar o servidor MCP, de acordo com a extensão do script.
+# Scripts Python usam o mesmo interpretador do cliente (sys.executable), não o "python" do PATH.
+_COMMAND_BY_EXT = {".py": sys.executable, ".js": "node", ".mjs": "node", ".ts": "tsx"}
+
 # Configura parâmetros para iniciar o servidor MCP.
 server_params = StdioServerParameters(
-    command="python" if server_script.endswith(".py") else "node",
+    command=_COMMAND_BY_EXT.get(os.path.splitext(server_script)[1], "node"),
     args=[server_script],
 )
 
-# Variável global para manter a sessão MCP ativa.
-# Este é um simples recipiente com um atributo "session" para uso pelo adaptador de ferramenta.
-mcp_client = None
+# ---------------------------
+# Recipiente da Sessão MCP
+# ---------------------------
+class MCPSessionHolder:
+    """
+    Mantém uma única sessão MCP de longa duração sobre stdio.
+
+    O subprocesso do servidor é iniciado uma vez em connect() e reutilizado por todas as chamadas
+    de ferramentas até disconnect(), evitando um novo processo e um novo handshake 'initialize' por chamada.
+    As ferramentas carregadas com load_mcp_tools também são mantidas em cache após a conexão.
+    """
+    def __init__(self, params: StdioServerParameters):
+        self.params = params
+        self.session: Optional[ClientSession] = None
+        self.tools: Optional[List] = None
+        self._exit_stack: Optional[AsyncExitStack] = None
+
+    async def connect(self) -> ClientSession:
+        """Inicia o servidor MCP, inicializa a sessão e carrega as ferramentas (apenas na primeira chamada)."""
+        if self.session is not None:
+            return self.session
+        exit_stack = AsyncExitStack()
+        try:
+            read, write = await exit_stack.enter_async_context(stdio_client(self.params))
+            session = await exit_stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()  # Inicializa a sessão MCP
+            # Carrega as ferramentas MCP usando o adaptador; isso lida com aguardar e a conversão.
+            self.tools = await load_mcp_tools(session)
+        except BaseException:
+            await exit_stack.aclose()
+            raise
+        self._exit_stack = exit_stack
+        self.session = session
+        return session
+
+    async def disconnect(self):
+        """Encerra a sessão MCP e o subprocesso do servidor."""
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._exit_stack = None
+        self.session = None
+        self.tools = None
+
+# Variável global para manter a sessão MCP ativa para uso pelo adaptador de ferramenta.
+mcp_client: Optional[MCPSessionHolder] = None
 
 # ---------------------------
 # Função Assíncrona Principal: run_agent
@@ -100,38 +184,38 @@ async def run_agent():
     Conecta ao servidor MCP, carrega as ferramentas MCP, cria um agente React e executa um loop de chat interativo.
     
     Passos:
-      1. Abre uma conexão stdio com o servidor MCP.
-      2. Cria e inicializa uma sessão MCP.
-      3. Armazena a sessão em um recipiente global (mcp_client) para acesso às ferramentas.
-      4. Carrega as ferramentas MCP usando load_mcp_tools.
-      5. Cria um agente React usando create_react_agent com o LLM e as ferramentas carregadas.
-      6. Entra em um loop interativo: para cada consulta do usuário, invoca o agente assincronamente usando ainvoke,
-         então imprime a resposta como JSON formatado usando nosso codificador personalizado.
+      1. Cria o recipiente global (mcp_client) da sessão MCP.
+      2. Conecta uma única vez: abre a conexão stdio, inicializa a sessão e carrega as ferramentas.
+      3. Cria um agente React usando create_react_agent com o LLM e as ferramentas carregadas.
+      4. Entra em um loop interativo: para cada consulta do usuário, invoca o agente assincronamente usando ainvoke,
+         então imprime a resposta como JSON formatado usando nossa função padrão personalizada.
+      5. Desconecta do servidor MCP ao sair, mesmo em caso de erro.
     """
     global mcp_client
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()  # Inicializa a sessão MCP
-            # Define o mcp_client global para um objeto simples contendo a sessão.
-            mcp_client = type("MCPClientHolder", (), {"session": session})()
-            # Carrega as ferramentas MCP usando o adaptador; isso lida com aguardar e a conversão.
-            tools = await load_mcp_tools(session)
-            # Cria um agente React usando o LLM e as ferramentas carregadas.
-            agent = create_react_agent(llm, tools)
-            print("Cliente MCP Iniciado! Digite 'quit' para sair.")
-            while True:
-                query = input("\nConsulta: ").strip()
-                if query.lower() == "quit":
-                    break
-                # O agente espera a entrada como um dict com a chave "messages".
-                response = await agent.ainvoke({"messages": query})
-                # Formata a resposta como JSON usando o codificador personalizado.
-                try:
-                    formatted = json.dumps(response, indent=2, cls=CustomEncoder)
-                except Exception as e:
-                    formatted = str(response)
-                print("\nResposta:")
-                print(formatted)
+    mcp_client = MCPSessionHolder(server_params)
+    try:
+        # Inicia o servidor MCP uma única vez; a sessão e as ferramentas são reutilizadas no loop.
+        await mcp_client.connect()
+        # Cria um agente React usando o LLM e as ferramentas carregadas.
+        agent = create_react_agent(llm, mcp_client.tools)
+        print("Cliente MCP Iniciado! Digite 'quit' para sair.")
+        while True:
+            # Lê a entrada sem bloquear o loop de eventos enquanto o usuário digita
+            query = (await ainput("\nConsulta: ")).strip()
+            if query.lower() == "quit":
+                break
+            # O agente espera a entrada como um dict com a chave "messages".
+            response = await agent.ainvoke({"messages": query})
+            # Formata a resposta como JSON usando a função padrão personalizada.
+            try:
+                formatted = orjson.dumps(response, default=_default, option=orjson.OPT_INDENT_2).decode()
+            except Exception as e:
+                formatted = str(response)
+            print("\nResposta:")
+            print(formatted)
+    finally:
+        # Garante que o subprocesso do servidor MCP seja encerrado
+        await mcp_client.disconnect()
     return
 
 # ---------------------------
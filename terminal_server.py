@@ -1,5 +1,6 @@
+import asyncio
 import os
-import subprocess
+import shlex
 from mcp.server.fastmcp import FastMCP
 
 # Cria uma instância do FastMCP com o nome "Terminal".
@@ -11,8 +12,20 @@ mcp = FastMCP("Terminal")
 # na pasta pessoal do usuário (ex: /home/usuario/mcp-client/output no Linux, ou C:\Users\Usuario\mcp-client\output no Windows).
 DEFAULT_WORKSPACE = os.path.expanduser("~/mcp-client/output")
 
+# Caracteres que exigem o shell do sistema (pipes, redirecionamentos, variáveis, etc.).
+# Comandos sem nenhum deles são executados diretamente, sem iniciar um processo de shell.
+SHELL_METACHARACTERS = set("|&;<>()$`\\\"'*?[]#~=%{}\n")
+
+# Tamanho de cada bloco lido das saídas do processo
+READ_CHUNK_SIZE = 64 * 1024
+
+async def _drain(stream: asyncio.StreamReader, buffer: bytearray):
+    """Lê um fluxo até o fim, acumulando os blocos em um único buffer."""
+    while chunk := await stream.read(READ_CHUNK_SIZE):
+        buffer += chunk
+
 @mcp.tool()  
-def run_command(command: str):  
+async def run_command(command: str):  
     """ 
     Executa um comando de terminal dentro do diretório de trabalho (DEFAULT_WORKSPACE).
 
@@ -24,15 +37,29 @@ def run_command(command: str):
              ou a mensagem de erro se a execução falhar.
 """
     try:  
-        # Executa o comando usando subprocess.run.
-        # - command: O comando a ser executado.
-        # - shell=True: Permite que o comando seja executado através do shell do sistema.
+        # Executa o comando de forma assíncrona, sem bloquear o loop de eventos do servidor MCP.
+        # - Comandos simples são divididos com shlex e executados diretamente (sem processo de shell).
+        # - Comandos com pipes, redirecionamentos, etc. continuam passando pelo shell do sistema.
         # - cwd=DEFAULT_WORKSPACE: Define o diretório de trabalho atual para a execução do comando.
-        # - capture_output=True: Captura a saída padrão e a saída de erro.
-        # - text=True: Decodifica stdout e stderr como texto.
-        result = subprocess.run(command, shell=True, cwd=DEFAULT_WORKSPACE, capture_output=True, text=True)  
+        # - stdout/stderr=PIPE: Captura a saída padrão e a saída de erro.
+        if SHELL_METACHARACTERS.isdisjoint(command):
+            proc = await asyncio.create_subprocess_exec(
+                *shlex.split(command), cwd=DEFAULT_WORKSPACE,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+        else:
+            proc = await asyncio.create_subprocess_shell(
+                command, cwd=DEFAULT_WORKSPACE,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+
+        # Lê stdout e stderr simultaneamente (evita bloqueio se um dos pipes encher)
+        stdout, stderr = bytearray(), bytearray()
+        await asyncio.gather(_drain(proc.stdout, stdout), _drain(proc.stderr, stderr))
+        await proc.wait()
+
         # Retorna a saída padrão se existir, caso contrário, retorna a saída de erro.
-        return result.stdout or result.stderr  
+        return stdout.decode(errors="replace") or stderr.decode(errors="replace")
     except Exception as e:  
         return str(e)
     